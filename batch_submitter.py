@@ -0,0 +1,198 @@
+import asyncio
+import json
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .retries import api_retry
+
+
+# Limits of a single Batch API input file.
+MAX_BATCH_REQUESTS = 1000
+MAX_BATCH_BYTES = 50 * 1024 * 1024
+
+# How long to wait for more requests before submitting a partial batch.
+BATCH_LINGER_SECONDS = 5.0
+
+POLL_INITIAL_DELAY = 10.0
+POLL_MAX_DELAY = 300.0
+
+_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchHandle:
+    """Handle for a request queued for the Batch API."""
+
+    def __init__(self, custom_id: str, future: "asyncio.Future[Dict[str, Any]]"):
+        self.custom_id = custom_id
+        self._future = future
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    async def result(self) -> Dict[str, Any]:
+        """Wait for the batch to finish and return the response body."""
+        return await asyncio.shield(self._future)
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.lines: List[bytes] = []
+        self.futures: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self.size = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class BatchSubmitter:
+    """Buffers requests for one client and endpoint and submits them as batches.
+
+    The Batch API only accepts input files whose requests all use the same
+    model, so `enqueue` keeps one submitter per model.
+
+    A batch is submitted as soon as it reaches MAX_BATCH_REQUESTS lines or
+    MAX_BATCH_BYTES, or BATCH_LINGER_SECONDS after its first request, so that
+    requests from nodes executing concurrently end up in the same batch.
+    """
+
+    def __init__(self, client: "AsyncOpenAI", endpoint: str):
+        self.client = client
+        self.endpoint = endpoint
+        self._pending = _PendingBatch()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    def enqueue(self, body: Dict[str, Any]) -> BatchHandle:
+        loop = asyncio.get_running_loop()
+        custom_id = uuid.uuid4().hex
+        request = {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": self.endpoint,
+            "body": body
+        }
+        line = (orjson.dumps(request) if orjson else json.dumps(request).encode("utf-8")) + b"\n"
+
+        if self._pending.lines and self._pending.size + len(line) > MAX_BATCH_BYTES:
+            self._flush()
+
+        future = loop.create_future()
+        pending = self._pending
+        pending.lines.append(line)
+        pending.futures[custom_id] = future
+        pending.size += len(line)
+
+        if len(pending.lines) >= MAX_BATCH_REQUESTS or pending.size >= MAX_BATCH_BYTES:
+            self._flush()
+        elif pending.timer is None:
+            pending.timer = loop.call_later(BATCH_LINGER_SECONDS, self._flush)
+
+        return BatchHandle(custom_id, future)
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, _PendingBatch()
+        if pending.timer is not None:
+            pending.timer.cancel()
+        if not pending.lines:
+            return
+        task = asyncio.ensure_future(self._run_batch(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, pending: _PendingBatch) -> None:
+        file_ids: List[str] = []
+        try:
+            batch_file = await api_retry(self.client.files.create)(
+                file=("batch.jsonl", b"".join(pending.lines)),
+                purpose="batch"
+            )
+            file_ids.append(batch_file.id)
+            batch = await api_retry(self.client.batches.create)(
+                input_file_id=batch_file.id,
+                endpoint=self.endpoint,
+                completion_window="24h"
+            )
+            batch = await self._wait_for_batch(batch.id)
+
+            # Expired and cancelled batches still return (and bill) the
+            # requests that finished, so results are dispatched for any
+            # terminal status.
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    file_ids.append(file_id)
+                    await self._dispatch_results(file_id, pending.futures)
+
+            for custom_id, future in pending.futures.items():
+                if future.done():
+                    continue
+                if batch.status != "completed":
+                    future.set_exception(RuntimeError(f"Batch {batch.id} ended with status: {batch.status}"))
+                else:
+                    future.set_exception(RuntimeError(f"No result returned for batch request {custom_id}"))
+
+        except Exception as e:
+            for future in pending.futures.values():
+                if not future.done():
+                    future.set_exception(e)
+
+        finally:
+            await self._delete_files(file_ids)
+
+    async def _delete_files(self, file_ids: List[str]) -> None:
+        """Delete the batch's input and result files; failures only leave them behind."""
+        for file_id in file_ids:
+            try:
+                await api_retry(self.client.files.delete)(file_id)
+            except Exception:
+                pass
+
+    async def _wait_for_batch(self, batch_id: str):
+        """Poll the batch with exponential backoff until it reaches a terminal status."""
+        delay = POLL_INITIAL_DELAY
+        while True:
+            batch = await api_retry(self.client.batches.retrieve)(batch_id)
+            if batch.status in _TERMINAL_STATUSES:
+                return batch
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_DELAY)
+
+    async def _dispatch_results(self, file_id: str,
+                                futures: Dict[str, "asyncio.Future[Dict[str, Any]]"]) -> None:
+        content = await api_retry(self.client.files.content)(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            future = futures.get(result.get("custom_id"))
+            if future is None or future.done():
+                continue
+
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                error = result.get("error") or response.get("body", {}).get("error")
+                future.set_exception(RuntimeError(f"Batch request failed: {error}"))
+            else:
+                future.set_result(response["body"])
+
+
+_SUBMITTERS: Dict[Tuple["AsyncOpenAI", str, str], BatchSubmitter] = {}
+
+
+async def enqueue(client: "AsyncOpenAI", endpoint: str, body: Dict[str, Any]) -> BatchHandle:
+    """Queue a request body for the Batch API and return a handle to its result."""
+    key = (client, endpoint, body["model"])
+    submitter = _SUBMITTERS.get(key)
+    if submitter is None:
+        submitter = BatchSubmitter(client, endpoint)
+        _SUBMITTERS[key] = submitter
+    return submitter.enqueue(body)
+
+
+def clear_submitters() -> None:
+    """Forget all submitters, e.g. after the clients they were created for were dropped."""
+    _SUBMITTERS.clear()
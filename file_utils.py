@@ -0,0 +1,16 @@
+import asyncio
+import os
+from typing import Set
+
+
+# Directories already created by ensure_dir. No lock is needed: makedirs with
+# exist_ok is idempotent, so a race only costs a redundant syscall.
+_DIR_SEEN: Set[str] = set()
+
+
+async def ensure_dir(path: str) -> None:
+    """Create the parent directory of a file path if it doesn't exist yet."""
+    directory = os.path.dirname(os.path.abspath(path)) or "."
+    if directory not in _DIR_SEEN:
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+        _DIR_SEEN.add(directory)
@@ -0,0 +1,230 @@
+import asyncio
+import base64
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, TypeVar, Union
+
+from . import openai_cache
+from .retries import api_retry
+
+
+T = TypeVar("T")
+
+# Shared across all node executions so that the reads of every frame in a
+# request are issued at the same time and the OS can schedule them together.
+_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="openai-io")
+
+# Vision models downsample larger images server-side anyway.
+MAX_IMAGE_SIZE = (2048, 2048)
+JPEG_QUALITY = 80
+
+# Formats that are sent unchanged when they already fit in MAX_IMAGE_SIZE.
+_PASSTHROUGH_FORMATS = ("JPEG", "WEBP")
+
+# A multiple of 3 so that no chunk but the last produces base64 padding.
+_CHUNK_SIZE = 48 * 1024
+
+# How long a cached Files API upload is reused. Bounds how long requests
+# keep failing if the file is deleted from the account in the meantime.
+VISION_FILE_TTL = 24 * 60 * 60
+
+
+def guess_image_mime_type(header: bytes) -> str:
+    """Guess the image MIME type from the file's magic bytes."""
+    if header.startswith(b'\x89PNG'):
+        return "image/png"
+    if header.startswith(b'\xff\xd8'):
+        return "image/jpeg"
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return "image/webp"
+    if header.startswith((b'GIF87a', b'GIF89a')):
+        return "image/gif"
+    return "image/jpeg"
+
+
+@lru_cache(maxsize=None)
+def _pil_image():
+    """Import Pillow on first use; returns the PIL.Image module or None."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def downscale_image(image_path: str) -> Optional[bytes]:
+    """Downscale an image to MAX_IMAGE_SIZE and re-encode it as JPEG.
+
+    The EXIF orientation is applied to the pixels, since the re-encoded
+    JPEG carries no EXIF data. Returns None when Pillow is not installed,
+    the file is not a readable image (or too large for Pillow to decode
+    safely), or the original is already small enough to send unchanged.
+    """
+    Image = _pil_image()
+    if Image is None:
+        return None
+    from PIL import ImageOps
+
+    try:
+        with Image.open(image_path) as original:
+            fits = original.width <= MAX_IMAGE_SIZE[0] and original.height <= MAX_IMAGE_SIZE[1]
+            if fits and original.format in _PASSTHROUGH_FORMATS:
+                return None
+
+            img = ImageOps.exif_transpose(original)
+            img.thumbnail(MAX_IMAGE_SIZE, Image.LANCZOS)
+            if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                # Flatten transparency onto white instead of JPEG's default black
+                rgba = img.convert("RGBA")
+                rgb = Image.new("RGB", rgba.size, (255, 255, 255))
+                rgb.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                rgb = img.convert("RGB")
+
+            buf = io.BytesIO()
+            rgb.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    data = buf.getvalue()
+    if fits and len(data) >= os.path.getsize(image_path):
+        return None
+    return data
+
+
+def _read_image(image_path: str) -> Tuple[bytes, str]:
+    """Read an image file as is; returns (data, MIME type)."""
+    with open(image_path, "rb") as image_file:
+        data = image_file.read()
+    return data, guess_image_mime_type(data[:12])
+
+
+def encode_data_url(data: bytes, mime_type: str) -> str:
+    """Convert image bytes to a base64 data URL."""
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def encode_file_to_data_url(image_path: str) -> str:
+    """Convert an image file to a base64 data URL without downscaling it.
+
+    The file is encoded chunk by chunk into a single buffer so that the raw
+    bytes and the encoded copy never have to be held in memory together.
+    """
+    buf = bytearray()
+    mime_type = None
+    with open(image_path, "rb", buffering=1 << 20) as image_file:
+        while chunk := image_file.read(_CHUNK_SIZE):
+            if mime_type is None:
+                mime_type = guess_image_mime_type(chunk[:12])
+            buf += base64.b64encode(chunk)
+    return f"data:{mime_type or 'image/jpeg'};base64,{buf.decode('ascii')}"
+
+
+async def run_in_io_pool(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking file operation on the shared I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_POOL, func, *args)
+
+
+VISION_UPLOAD_MODES = ("inline", "files_api")
+
+
+def get_vision_upload_mode(params) -> str:
+    """Get how local images are sent to the model from the LLM parameters.
+
+    "inline" embeds the image as a base64 data URL in the request body,
+    "files_api" uploads it once through the Files API and references it by ID.
+    """
+    upload_mode = getattr(params, "vision_upload_mode", None) or "inline"
+    if upload_mode not in VISION_UPLOAD_MODES:
+        raise ValueError(f"Unsupported vision upload mode: {upload_mode}")
+    return upload_mode
+
+
+def is_image_url(image_path: str) -> bool:
+    """Whether the image is given by URL rather than as a local file."""
+    return image_path.startswith(('http://', 'https://'))
+
+
+async def prefetch_image(image_path: str) -> Optional[bytes]:
+    """Downscale a local image ahead of `get_image_url`.
+
+    This is the slow part of preparing an image and does not depend on the
+    upload mode, so nodes run it while the LLM configuration loads. Returns
+    None for image URLs and for images that are sent as they are.
+    """
+    if is_image_url(image_path):
+        return None
+    return await run_in_io_pool(downscale_image, image_path)
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+async def upload_vision_file(client, filename: str, data: bytes, mime_type: str,
+                             use_cache: bool = False) -> str:
+    """Upload an image through the Files API and return its file ID.
+
+    With `use_cache`, file IDs are cached for VISION_FILE_TTL seconds per
+    API key, base URL and content, so re-running a workflow reuses the
+    earlier upload instead of adding another copy of the image to the
+    account. Otherwise the caller deletes the file with
+    `delete_vision_files` once the request is done.
+    """
+    cache_key = None
+    if use_cache:
+        cache_key = await openai_cache.make_key("files.create", str(client.base_url), {
+            "api_key": client.api_key,
+            "purpose": "vision",
+            "sha256": await run_in_io_pool(_sha256_hex, data)
+        })
+        file_id = await openai_cache.get(cache_key)
+        if file_id is not None:
+            return file_id
+
+    uploaded = await api_retry(client.files.create)(
+        file=(filename, data, mime_type),
+        purpose="vision"
+    )
+    if cache_key:
+        await openai_cache.put(cache_key, uploaded.id, expire=VISION_FILE_TTL)
+    return uploaded.id
+
+
+async def delete_vision_files(client, image_refs: Iterable[Union[str, Dict[str, str]]]) -> None:
+    """Delete the uploaded files among image references from `get_image_url`.
+
+    Deletion is best-effort; a failure only leaves the file in the account.
+    """
+    for ref in image_refs:
+        if isinstance(ref, dict) and "file_id" in ref:
+            try:
+                await api_retry(client.files.delete)(ref["file_id"])
+            except Exception:
+                pass
+
+
+async def get_image_url(image_path: str, downscaled: Optional[bytes], client,
+                        upload_mode: str, use_cache: bool = False) -> Union[str, Dict[str, str]]:
+    """Get the image reference for a request: a URL, a base64 data URL or an uploaded file ID.
+
+    `downscaled` is the result of `prefetch_image` for the same path. Images
+    that were not downscaled are encoded or read from the file only now.
+    `use_cache` is passed on to `upload_vision_file`.
+    """
+    if is_image_url(image_path):
+        return image_path
+    if upload_mode == "files_api":
+        if downscaled is not None:
+            data, mime_type = downscaled, "image/jpeg"
+        else:
+            data, mime_type = await run_in_io_pool(_read_image, image_path)
+        file_id = await upload_vision_file(client, os.path.basename(image_path), data, mime_type, use_cache)
+        return {"file_id": file_id}
+    if downscaled is not None:
+        return await run_in_io_pool(encode_data_url, downscaled, "image/jpeg")
+    return await run_in_io_pool(encode_file_to_data_url, image_path)
@@ -1,17 +1,22 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id
 except ImportError:
     from stub import Node, register_node, get_api_key
 
-import os
+import asyncio
 from typing import Dict, Any, Optional
-from openai import OpenAI
-import requests
+import aiofiles
+
+from . import openai_cache
+from .file_utils import ensure_dir
+from .node_inputs import compile_inputs
+from .openai_client import call_api, get_client, get_http_client, get_limiter, load_llm_config
+from .retries import download_retry
 
 
 @register_node
+@compile_inputs
 class ImageGenerationNode(Node):
     NAME = "AI Image Generation"
     DESCRIPTION = "Generate images from text descriptions using OpenAI's DALL-E models"
@@ -56,6 +61,13 @@ class ImageGenerationNode(Node):
             "required": True,
             "default": "output.png"
         },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "AI Model",
             "description": "ID of the AI model configuration to use",
@@ -73,59 +85,61 @@ class ImageGenerationNode(Node):
         }
     }
     
-    def _download_image(self, image_url: str, output_path: str) -> None:
-        """Download image from URL and save to file."""
-        response = requests.get(image_url)
-        response.raise_for_status()
-        
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+    @download_retry
+    async def _download_image(self, image_url: str, output_path: str) -> None:
+        """Download image from URL and stream it to file."""
+        async with get_http_client().stream("GET", image_url) as response:
+            response.raise_for_status()
+            async with aiofiles.open(output_path, 'wb') as f:
+                async for chunk in response.aiter_bytes(1 << 16):
+                    await f.write(chunk)
     
     async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
             # Get inputs
-            prompt = node_inputs["prompt"]
-            size = node_inputs["size"]
-            quality = node_inputs.get("quality", "standard")
-            style = node_inputs.get("style", "vivid")
-            output_file = node_inputs["output_file"]
-            llm_config_id = node_inputs["llm_config_id"]
+            inp = self._parse_inputs(node_inputs)
+            prompt = inp.prompt
+            size = inp.size
+            quality = inp.quality
+            style = inp.style
+            output_file = inp.output_file
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
             
-            # Get LLM configuration
+            # Get LLM configuration, creating the output directory meanwhile
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
-            
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
-            
-            # Initialize OpenAI client
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
+            (llm_config, params), _ = await asyncio.gather(
+                load_llm_config(llm_config_id),
+                ensure_dir(output_file)
             )
             
-            # Create output directory if it doesn't exist
-            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
-            
-            # Make API call
-            workflow_logger.info("Sending request to DALL-E model")
-            response = client.images.generate(
-                model=llm_config.llm_name,
-                prompt=prompt,
-                size=size,
-                quality=quality,
-                style=style,
-                n=1
-            )
+            # Get OpenAI client
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
             
-            # Download and save the image
-            image_url = response.data[0].url
-            self._download_image(image_url, output_file)
-            workflow_logger.info(f"Successfully saved image to {output_file}")
+            api_params = {
+                "model": llm_config.llm_name,
+                "prompt": prompt,
+                "size": size,
+                "quality": quality,
+                "style": style,
+                "n": 1
+            }
+            cache_key = await openai_cache.make_key("images.generate", params.base_url, api_params) if use_cache else None
+            if cache_key and await openai_cache.get_file(cache_key, output_file):
+                workflow_logger.info(f"Saved cached image to {output_file}")
+            else:
+                # Make API call
+                workflow_logger.info("Sending request to DALL-E model")
+                response = await call_api(limiter, client.images.generate, **api_params)
+                
+                # Download and save the image
+                image_url = response.data[0].url
+                await self._download_image(image_url, output_file)
+                if cache_key:
+                    await openai_cache.put_file(cache_key, output_file)
+                workflow_logger.info(f"Successfully saved image to {output_file}")
             
             return {
                 "success": True,
@@ -1,17 +1,26 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id
 except ImportError:
     from stub import Node, register_node, get_api_key
 
-import os
+import asyncio
 from typing import Dict, Any, Optional
-from openai import OpenAI
-import base64
+
+from .image_encoding import (
+    delete_vision_files,
+    get_image_url,
+    get_vision_upload_mode,
+    is_image_url,
+    prefetch_image,
+)
+from . import openai_cache
+from .node_inputs import compile_inputs
+from .openai_client import create_chat_completion, get_client, get_limiter, load_llm_config
 
 
 @register_node
+@compile_inputs
 class ImageRecognitionNode(Node):
     NAME = "AI Image Recognition"
     DESCRIPTION = "Use AI to analyze and describe image content using various LLM models"
@@ -31,6 +40,21 @@ class ImageRecognitionNode(Node):
             "required": True,
             "default": "What is in this image?"
         },
+        "mode": {
+            "label": "Request Mode",
+            "description": "realtime sends the request immediately, batch queues it for the Batch API (half the cost, results within 24 hours)",
+            "type": "STRING",
+            "required": False,
+            "default": "realtime",
+            "choices": ["realtime", "batch"]
+        },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "LLM Configuration",
             "description": "ID of the LLM configuration to use",
@@ -48,55 +72,65 @@ class ImageRecognitionNode(Node):
         }
     }
 
-    def _encode_image_to_base64(self, image_path: str) -> str:
-        """Convert image to base64 string."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-
-    def _get_image_url(self, image_path: str) -> str:
-        """Get image URL or base64 data URL."""
-        if image_path.startswith(('http://', 'https://')):
-            return image_path
-        else:
-            base64_image = self._encode_image_to_base64(image_path)
-            return f"data:image/jpeg;base64,{base64_image}"
-
     async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
-            image_path = node_inputs["image_path"]
-            prompt = node_inputs["prompt"]
-            llm_config_id = node_inputs["llm_config_id"]
+            inp = self._parse_inputs(node_inputs)
+            image_path = inp.image_path
+            prompt = inp.prompt
+            mode = inp.mode
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
 
+            # Downscale the image while the LLM configuration is being fetched
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
+            (llm_config, params), downscaled = await asyncio.gather(
+                load_llm_config(llm_config_id),
+                prefetch_image(image_path)
+            )
 
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
 
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
-            )
+            cache_key = None
+            if use_cache:
+                local_files = [] if is_image_url(image_path) else [image_path]
+                cache_key = await openai_cache.make_key("chat.completions", params.base_url, {
+                    "model": llm_config.llm_name,
+                    "prompt": prompt,
+                    "image": image_path
+                }, local_files)
+            response = await openai_cache.get(cache_key) if cache_key else None
+            if response is not None:
+                workflow_logger.info("Using cached AI analysis")
+                return {
+                    "success": True,
+                    "description": response
+                }
 
-            image_url = self._get_image_url(image_path)
+            upload_mode = get_vision_upload_mode(params)
+            image_url = await get_image_url(image_path, downscaled, client, upload_mode, use_cache)
+            if isinstance(image_url, str):
+                image_url = {"url": image_url}
             
-            workflow_logger.info("Sending request to AI model")
-            completion = client.chat.completions.create(
-                model=llm_config.llm_name,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": image_url}}
-                    ]
-                }]
-            )
+            workflow_logger.info(f"Sending request to AI model ({mode})")
+            try:
+                response = await create_chat_completion(client, limiter, {
+                    "model": llm_config.llm_name,
+                    "messages": [{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image_url", "image_url": image_url}
+                        ]
+                    }]
+                }, mode)
+            finally:
+                if not use_cache:
+                    await delete_vision_files(client, [image_url])
+            if cache_key:
+                await openai_cache.put(cache_key, response)
 
-            response = completion.choices[0].message.content
             workflow_logger.info("Successfully received AI analysis")
 
             return {
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+if TYPE_CHECKING:
+    import diskcache
+
+try:
+    from blake3 import blake3 as _key_hash
+except ImportError:
+    _key_hash = hashlib.blake2b
+
+
+CACHE_DIR = os.path.expanduser("~/.cache/autotask_openai")
+CACHE_SIZE_LIMIT = 10 << 30
+
+_cache: Optional["diskcache.Cache"] = None
+
+
+def _get_cache() -> "diskcache.Cache":
+    global _cache
+
+    if _cache is None:
+        import diskcache
+
+        _cache = diskcache.Cache(CACHE_DIR, size_limit=CACHE_SIZE_LIMIT)
+    return _cache
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb", buffering=1 << 20) as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _make_key(endpoint: str, base_url: Optional[str], body: Dict[str, Any], files: Iterable[str]) -> str:
+    payload = json.dumps({
+        "endpoint": endpoint,
+        "base_url": base_url,
+        "body": body,
+        "file_sha256": [_file_sha256(path) for path in files]
+    }, sort_keys=True, default=str)
+    return _key_hash(payload.encode("utf-8")).hexdigest()
+
+
+async def make_key(endpoint: str, base_url: Optional[str], body: Dict[str, Any],
+                   files: Iterable[str] = ()) -> str:
+    """Build the cache key of a request.
+
+    `base_url` is the API the request is sent to, since the same model name
+    can be served by different endpoints. `body` holds the request
+    parameters, including the model. Local files
+    sent with the request are listed in `files` and keyed by content, so an
+    edited file never hits a stale entry.
+    """
+    return await asyncio.to_thread(_make_key, endpoint, base_url, body, list(files))
+
+
+async def get(key: str) -> Optional[Any]:
+    """Return the cached value for the key, or None."""
+    return await asyncio.to_thread(_get_cache().get, key)
+
+
+async def put(key: str, value: Any, expire: Optional[float] = None) -> None:
+    """Store a value under the key, for `expire` seconds if given."""
+    await asyncio.to_thread(_get_cache().set, key, value, expire)
+
+
+def _copy_to_file(key: str, output_path: str) -> bool:
+    reader = _get_cache().get(key, read=True)
+    if reader is None:
+        return False
+    with reader, open(output_path, "wb") as f:
+        shutil.copyfileobj(reader, f, 1 << 20)
+    return True
+
+
+def _store_file(key: str, path: str) -> None:
+    with open(path, "rb") as f:
+        _get_cache().set(key, f, read=True)
+
+
+async def get_file(key: str, output_path: str) -> bool:
+    """Write the cached file for the key to output_path; return False on a miss."""
+    return await asyncio.to_thread(_copy_to_file, key, output_path)
+
+
+async def put_file(key: str, path: str) -> None:
+    """Store the contents of a file under the key."""
+    await asyncio.to_thread(_store_file, key, path)
@@ -0,0 +1,274 @@
+try:
+    from autotask.llm import get_llm_config_by_id
+except ImportError:
+    from stub import get_llm_config_by_id
+
+import asyncio
+import atexit
+import importlib.util
+import threading
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache, cached
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# httpx and openai (with pydantic) are slow to import, so they are only
+# loaded when the first client is created rather than when the plugin loads.
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+from . import batch_submitter
+from .retries import api_retry
+
+
+T = TypeVar("T")
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+REQUEST_MODES = ("realtime", "batch")
+
+# LLM configurations can be edited while workflows run, so they are only
+# cached for a few minutes.
+LLM_CONFIG_TTL = 300
+
+DEFAULT_MAX_CONCURRENT = 20
+DEFAULT_RPM = 500
+
+_http_client: Optional["httpx.AsyncClient"] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_CLIENT_CACHE: Dict[Tuple[str, str], "AsyncOpenAI"] = {}
+_CLOSE_TASKS: Set["asyncio.Task[None]"] = set()
+
+
+def _new_http_client() -> "httpx.AsyncClient":
+    import httpx
+
+    return httpx.AsyncClient(
+        # One HTTP/2 connection multiplexes many concurrent requests. Servers
+        # that do not negotiate h2 (e.g. a self-hosted base_url over plain
+        # http) are spoken to over HTTP/1.1 on the same pool.
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_keepalive_connections=32,
+            max_connections=32,
+            keepalive_expiry=90
+        ),
+        # Long completions can take minutes before the response starts. The
+        # pool is shared by all limiters, so over HTTP/1.1 several models can
+        # need more than max_connections at once; those requests wait for a
+        # free connection rather than failing with PoolTimeout. The limiters
+        # already bound how many requests are in flight.
+        timeout=httpx.Timeout(connect=5.0, read=300.0, write=60.0, pool=None)
+    )
+
+
+class Limiter:
+    """Caps the concurrent requests and requests per minute sent for one api key and model."""
+
+    def __init__(self, max_concurrent: int, rpm: int):
+        self.sem = asyncio.Semaphore(max_concurrent)
+        self.rpm = AsyncLimiter(rpm, 60)
+
+    async def __aenter__(self) -> "Limiter":
+        await self.sem.acquire()
+        try:
+            await self.rpm.acquire()
+        except BaseException:
+            self.sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.sem.release()
+
+
+_LIMITERS: Dict[Tuple[str, str], Limiter] = {}
+
+
+@cached(TTLCache(maxsize=128, ttl=LLM_CONFIG_TTL), lock=threading.Lock())
+def _cached_config(llm_config_id: str) -> Tuple[Any, Any]:
+    llm_config = get_llm_config_by_id(llm_config_id)
+    if not llm_config:
+        raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
+
+    params = llm_config.get_typed_parameters()
+    if not params:
+        raise ValueError("Failed to get typed parameters from LLM configuration")
+    return llm_config, params
+
+
+async def load_llm_config(llm_config_id: str) -> Tuple[Any, Any]:
+    """Return the LLM configuration and its typed parameters.
+
+    The lookup runs in a worker thread so it does not block the event loop,
+    and its result is cached for LLM_CONFIG_TTL seconds. Failed lookups are
+    not cached.
+    """
+    return await asyncio.to_thread(_cached_config, llm_config_id)
+
+
+async def _aclose_quietly(client: "httpx.AsyncClient") -> None:
+    try:
+        await client.aclose()
+    except Exception:
+        # The connections belonged to a loop that is closed by now; their
+        # transports cannot be shut down from this one.
+        pass
+
+
+def _retire_http_client(client: Optional["httpx.AsyncClient"],
+                        loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a pooled client created on another event loop."""
+    if client is None or client.is_closed:
+        return
+    if loop is not None and loop.is_running():
+        # The owning loop still runs in another thread; close it there.
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+    task = asyncio.ensure_future(_aclose_quietly(client))
+    _CLOSE_TASKS.add(task)
+    task.add_done_callback(_CLOSE_TASKS.discard)
+
+
+def _check_loop() -> None:
+    """Drop cached clients created on another event loop.
+
+    Pooled connections belong to the loop they were opened on, so they
+    cannot be reused once the nodes are executed from a different loop.
+    The old pool is closed and the batch submitters using its clients are
+    forgotten along with them.
+    """
+    global _http_client, _loop
+
+    loop = asyncio.get_running_loop()
+    if _loop is not loop:
+        _retire_http_client(_http_client, _loop)
+        _http_client = None
+        _CLIENT_CACHE.clear()
+        _LIMITERS.clear()
+        batch_submitter.clear_submitters()
+        _loop = loop
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the keep-alive HTTP client shared by all nodes."""
+    global _http_client
+
+    _check_loop()
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _new_http_client()
+    return _http_client
+
+
+def get_client(params: Any) -> "AsyncOpenAI":
+    """Return the cached OpenAI client for the given LLM parameters.
+
+    One client is kept per (api_key, base_url); all of them share the
+    connection pool of `get_http_client`, so TCP and TLS handshakes are
+    paid once per host instead of once per node execution. The SDK's own
+    retries are disabled because calls are retried by `call_api`, and its
+    timeout is set to the pool's because the SDK passes one with every
+    request.
+    """
+    http_client = get_http_client()
+    key = (params.api_key, params.base_url)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(
+            api_key=params.api_key,
+            base_url=params.base_url,
+            http_client=http_client,
+            timeout=http_client.timeout,
+            max_retries=0
+        )
+        _CLIENT_CACHE[key] = client
+    return client
+
+
+def get_limiter(params: Any, model: str) -> Limiter:
+    """Return the limiter shared by all requests for the given api key and model.
+
+    The limits are read from the `max_concurrent` and `rpm` LLM parameters,
+    falling back to DEFAULT_MAX_CONCURRENT and DEFAULT_RPM.
+    """
+    _check_loop()
+    key = (params.api_key, model)
+    limiter = _LIMITERS.get(key)
+    if limiter is None:
+        limiter = Limiter(
+            getattr(params, "max_concurrent", None) or DEFAULT_MAX_CONCURRENT,
+            getattr(params, "rpm", None) or DEFAULT_RPM
+        )
+        _LIMITERS[key] = limiter
+    return limiter
+
+
+@api_retry
+async def call_api(limiter: Limiter, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+    """Call an OpenAI API method inside the limiter, retrying transient errors.
+
+    Each attempt acquires the limiter again, so retries count against the
+    same concurrency and rate limits as first attempts.
+    """
+    async with limiter:
+        return await func(*args, **kwargs)
+
+
+async def create_chat_completion(client: "AsyncOpenAI", limiter: Limiter, body: Dict[str, Any],
+                                 mode: str = "realtime") -> Optional[str]:
+    """Send a chat completion request and return the message content.
+
+    In "batch" mode the request is queued for the Batch API and the call
+    returns once the batch containing it has completed. Batches have their
+    own rate limits, so only realtime requests go through the limiter.
+    """
+    if mode not in REQUEST_MODES:
+        raise ValueError(f"Unsupported request mode: {mode}")
+
+    if mode == "batch":
+        handle = await batch_submitter.enqueue(client, CHAT_COMPLETIONS_ENDPOINT, body)
+        result = await handle.result()
+        return result["choices"][0]["message"]["content"]
+
+    if orjson is None:
+        completion = await call_api(limiter, client.chat.completions.create, **body)
+    else:
+        # The SDK encodes request bodies with the standard json module, which
+        # is slow for multi-MB bodies with base64 images. Since openai 1.99
+        # a body passed as bytes is sent unchanged (older releases hand it
+        # to httpx as json=, hence the minimum version in requirements.txt).
+        from openai.types.chat import ChatCompletion
+
+        completion = await call_api(limiter, client.post, "/chat/completions",
+                                    body=orjson.dumps(body), cast_to=ChatCompletion)
+    return completion.choices[0].message.content
+
+
+async def close_clients() -> None:
+    """Close the shared connection pool and forget all cached clients."""
+    global _http_client
+
+    _CLIENT_CACHE.clear()
+    batch_submitter.clear_submitters()
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+@atexit.register
+def _close_at_exit() -> None:
+    if _http_client is None or _http_client.is_closed:
+        return
+    try:
+        asyncio.run(close_clients())
+    except Exception:
+        # The loop owning the connections is already gone at this point;
+        # the sockets are released by the interpreter shutdown anyway.
+        pass
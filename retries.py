@@ -0,0 +1,70 @@
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from tenacity.wait import wait_base
+
+
+MAX_ATTEMPTS = 5
+MAX_RETRY_WAIT = 60.0
+
+
+class wait_retry_after(wait_base):
+    """Wait as long as the failed response's Retry-After header asks, if it has one."""
+
+    def __init__(self, fallback: wait_base):
+        self.fallback = fallback
+
+    def __call__(self, retry_state) -> float:
+        exc = retry_state.outcome.exception()
+        response = getattr(exc, "response", None)
+        if response is not None:
+            try:
+                return min(max(float(response.headers.get("retry-after")), 0.0), MAX_RETRY_WAIT)
+            except (TypeError, ValueError):
+                pass
+        return self.fallback(retry_state)
+
+
+# openai and httpx are imported when the first error is checked rather than
+# at module level, so that loading the plugin stays cheap. By then the
+# failed call has already imported them.
+
+def _is_retryable_api_error(exc: BaseException) -> bool:
+    import openai
+
+    return isinstance(exc, (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    ))
+
+
+def _is_retryable_download_error(exc: BaseException) -> bool:
+    import httpx
+
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+# Retries rate limits, connection problems, timeouts and 5xx's from the OpenAI API.
+api_retry = retry(
+    retry=retry_if_exception(_is_retryable_api_error),
+    wait=wait_retry_after(wait_random_exponential(min=1, max=MAX_RETRY_WAIT)),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True
+)
+
+# Same policy for plain HTTP downloads made with httpx.
+download_retry = retry(
+    retry=retry_if_exception(_is_retryable_download_error),
+    wait=wait_retry_after(wait_random_exponential(min=1, max=MAX_RETRY_WAIT)),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True
+)
@@ -1,15 +1,31 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id
 except ImportError:
     from stub import Node, register_node, get_api_key
 
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import asyncio
+import io
+import mimetypes
+import os
+from typing import Dict, Any, List, Optional
+
+from . import openai_cache
+from .node_inputs import compile_inputs
+from .openai_client import call_api, get_client, get_limiter, load_llm_config
+
+
+# Whisper rejects uploads larger than 25 MB.
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Larger files are split into 10 minute segments exported as 64 kbps mono
+# MP3, about 5 MB each, and transcribed concurrently.
+SEGMENT_MS = 10 * 60 * 1000
+MAX_CONCURRENT_SEGMENTS = 4
 
 
 @register_node
+@compile_inputs
 class SpeechToTextNode(Node):
     NAME = "Speech to Text"
     DESCRIPTION = "Convert audio to text using OpenAI's Whisper model"
@@ -37,6 +53,13 @@ class SpeechToTextNode(Node):
             "required": False,
             "default": ""
         },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "AI Model",
             "description": "ID of the AI model configuration to use",
@@ -54,35 +77,83 @@ class SpeechToTextNode(Node):
         }
     }
     
+    def _split_audio(self, audio_file: str) -> List[bytes]:
+        """Split an audio file into MP3 segments small enough to upload."""
+        try:
+            from pydub import AudioSegment
+        except ImportError:
+            raise ValueError("Audio files larger than 25 MB can only be transcribed with pydub installed")
+
+        audio = AudioSegment.from_file(audio_file)
+        segments = []
+        for start in range(0, len(audio), SEGMENT_MS):
+            buf = io.BytesIO()
+            audio[start:start + SEGMENT_MS].set_channels(1).export(buf, format="mp3", bitrate="64k")
+            segments.append(buf.getvalue())
+        return segments
+
+    async def _transcribe(self, client, limiter, audio_file: str, api_params: Dict[str, Any],
+                          workflow_logger) -> str:
+        """Transcribe an audio file, splitting it first if it exceeds the upload limit."""
+        file_name = os.path.basename(audio_file)
+        if os.path.getsize(audio_file) <= MAX_UPLOAD_BYTES:
+            content_type = mimetypes.guess_type(audio_file)[0] or "application/octet-stream"
+
+            # The file is reopened on every attempt so a retry uploads it from the start
+            async def transcribe(**kwargs):
+                with open(audio_file, "rb", buffering=1 << 20) as f:
+                    return await client.audio.transcriptions.create(
+                        file=(file_name, f, content_type), **kwargs
+                    )
+
+            # Make API call
+            workflow_logger.info("Sending request to Whisper model")
+            return (await call_api(limiter, transcribe, **api_params)).text
+        else:
+            workflow_logger.info("Audio file exceeds 25 MB, splitting into segments")
+            segments = await asyncio.to_thread(self._split_audio, audio_file)
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEGMENTS)
+            stem = os.path.splitext(file_name)[0]
+
+            async def transcribe_segment(index: int, data: bytes) -> str:
+                async with semaphore:
+                    result = await call_api(
+                        limiter,
+                        client.audio.transcriptions.create,
+                        file=(f"{stem}_{index}.mp3", data, "audio/mpeg"),
+                        **api_params
+                    )
+                return result.text
+
+            # Make API calls
+            workflow_logger.info(f"Sending {len(segments)} segments to Whisper model")
+            texts = await asyncio.gather(
+                *(transcribe_segment(i, data) for i, data in enumerate(segments))
+            )
+            return " ".join(text.strip() for text in texts)
+
     async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
             # Get inputs
-            audio_file = node_inputs["audio_file"]
-            language = node_inputs.get("language", "")
-            prompt = node_inputs.get("prompt", "")
-            llm_config_id = node_inputs["llm_config_id"]
+            inp = self._parse_inputs(node_inputs)
+            audio_file = inp.audio_file
+            language = inp.language
+            prompt = inp.prompt
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
             
             # Get LLM configuration
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
-            
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
+            llm_config, params = await load_llm_config(llm_config_id)
             
-            # Initialize OpenAI client
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
-            )
+            # Get OpenAI client
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
             
             # Prepare API call parameters
             api_params = {
                 "model": llm_config.llm_name,
-                "file": open(audio_file, "rb"),
             }
             
             if language:
@@ -90,15 +161,22 @@ class SpeechToTextNode(Node):
             if prompt:
                 api_params["prompt"] = prompt
             
-            # Make API call
-            workflow_logger.info("Sending request to Whisper model")
-            transcription = client.audio.transcriptions.create(**api_params)
+            cache_key = None
+            if use_cache:
+                cache_key = await openai_cache.make_key("audio.transcriptions", params.base_url, api_params, [audio_file])
+            transcription = await openai_cache.get(cache_key) if cache_key else None
+            if transcription is not None:
+                workflow_logger.info("Using cached transcription")
+            else:
+                transcription = await self._transcribe(client, limiter, audio_file, api_params, workflow_logger)
+                if cache_key:
+                    await openai_cache.put(cache_key, transcription)
             
             workflow_logger.info("Successfully received transcription")
             
             return {
                 "success": True,
-                "transcription": transcription.text
+                "transcription": transcription
             }
             
         except Exception as e:
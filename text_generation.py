@@ -1,15 +1,19 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id
 except ImportError:
     from stub import Node, register_node, get_api_key
 
-from typing import Dict, Any, Optional
-from openai import OpenAI
+import json
+from typing import Dict, Any, List, Optional
+
+from . import openai_cache
+from .node_inputs import compile_inputs
+from .openai_client import create_chat_completion, get_client, get_limiter, load_llm_config
 
 
 @register_node
+@compile_inputs
 class TextGenerationNode(Node):
     NAME = "AI Text Generation"
     DESCRIPTION = "Generate text using OpenAI's language models with chat completion API"
@@ -17,8 +21,8 @@ class TextGenerationNode(Node):
     INPUTS = {
         "prompt": {
             "label": "Prompt",
-            "description": "The text prompt to generate content from",
-            "type": "STRING",
+            "description": "The text prompt to generate content from, or a list of prompts to answer in a single request",
+            "type": "",
             "widget": "TEXTAREA",
             "required": True,
             "default": "Write a creative story"
@@ -33,7 +37,7 @@ class TextGenerationNode(Node):
         },
         "max_tokens": {
             "label": "Maximum Length",
-            "description": "Maximum number of tokens in the response",
+            "description": "Maximum number of tokens in the response, per prompt for a list of prompts (the request is capped at the maximum)",
             "type": "INTEGER",
             "required": False,
             "default": 1000,
@@ -49,6 +53,21 @@ class TextGenerationNode(Node):
             "minimum": 0.0,
             "maximum": 2.0
         },
+        "mode": {
+            "label": "Request Mode",
+            "description": "realtime sends the request immediately, batch queues it for the Batch API (half the cost, results within 24 hours)",
+            "type": "STRING",
+            "required": False,
+            "default": "realtime",
+            "choices": ["realtime", "batch"]
+        },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "AI Model",
             "description": "ID of the AI model configuration to use",
@@ -61,54 +80,82 @@ class TextGenerationNode(Node):
     OUTPUTS = {
         "generated_text": {
             "label": "Generated Text",
-            "description": "The AI-generated text response",
-            "type": "STRING"
+            "description": "The AI-generated text response, or a list of responses aligned with a list of prompts",
+            "type": ""
         }
     }
     
+    def _build_multi_prompt(self, prompts: List[str]) -> str:
+        """Combine several prompts into one user message asking for a JSON array of answers."""
+        inputs = "\n".join(f"[{i}] {p}" for i, p in enumerate(prompts))
+        return (
+            "Answer each of the following inputs independently. Respond with a JSON object "
+            "of the form {\"results\": [...]} containing exactly one answer string per input, "
+            f"in the same order as the inputs.\nInputs:\n{inputs}"
+        )
+
+    def _parse_multi_response(self, response: str, count: int) -> List[str]:
+        """Extract the list of answers from a multi-prompt JSON response."""
+        results = json.loads(response).get("results")
+        if not isinstance(results, list) or len(results) != count:
+            raise ValueError(f"Expected {count} results in model response, got: {response}")
+        return [r if isinstance(r, str) else json.dumps(r) for r in results]
+
     async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
             # Get inputs
-            prompt = node_inputs["prompt"]
-            system_prompt = node_inputs.get("system_prompt", "You are a helpful and creative assistant.")
-            max_tokens = node_inputs.get("max_tokens", 1000)
-            temperature = node_inputs.get("temperature", 0.7)
-            llm_config_id = node_inputs["llm_config_id"]
+            inp = self._parse_inputs(node_inputs)
+            prompt = inp.prompt
+            system_prompt = inp.system_prompt
+            max_tokens = inp.max_tokens
+            temperature = inp.temperature
+            mode = inp.mode
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
             
             # Get LLM configuration
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
+            llm_config, params = await load_llm_config(llm_config_id)
             
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
+            # Get OpenAI client
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
             
-            # Initialize OpenAI client
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
-            )
-            
-            # Prepare messages
+            # Prepare messages, collapsing a list of prompts into a single request
+            is_multi = isinstance(prompt, list)
+            if is_multi and not prompt:
+                raise ValueError("Prompt list must not be empty")
+            user_content = self._build_multi_prompt(prompt) if is_multi else prompt
             messages = [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": user_content}
             ]
+            if is_multi:
+                # Budget max_tokens per answer, within what the node allows for one request
+                max_tokens = min(max_tokens * len(prompt), self.INPUTS["max_tokens"]["maximum"])
+            body = {
+                "model": llm_config.llm_name,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            }
+            if is_multi:
+                body["response_format"] = {"type": "json_object"}
             
-            # Make API call
-            workflow_logger.info("Sending request to AI model")
-            completion = client.chat.completions.create(
-                model=llm_config.llm_name,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            
-            response = completion.choices[0].message.content
-            workflow_logger.info("Successfully received AI response")
+            cache_key = await openai_cache.make_key("chat.completions", params.base_url, body) if use_cache else None
+            response = await openai_cache.get(cache_key) if cache_key else None
+            if response is not None:
+                workflow_logger.info("Using cached AI response")
+            else:
+                # Make API call
+                workflow_logger.info(f"Sending request to AI model ({mode})")
+                response = await create_chat_completion(client, limiter, body, mode)
+                if is_multi:
+                    response = self._parse_multi_response(response, len(prompt))
+                if cache_key:
+                    await openai_cache.put(cache_key, response)
+                workflow_logger.info("Successfully received AI response")
             
             return {
                 "success": True,
@@ -1,16 +1,21 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id
 except ImportError:
     from stub import Node, register_node, get_api_key
 
-import os
+import asyncio
 from typing import Dict, Any, Optional
-from openai import OpenAI
+import aiofiles
+
+from . import openai_cache
+from .file_utils import ensure_dir
+from .node_inputs import compile_inputs
+from .openai_client import call_api, get_client, get_limiter, load_llm_config
 
 
 @register_node
+@compile_inputs
 class TextToSpeechNode(Node):
     NAME = "Text to Speech"
     DESCRIPTION = "Convert text to natural-sounding speech using OpenAI's TTS models"
@@ -31,14 +36,29 @@ class TextToSpeechNode(Node):
             "default": "alloy",
             "choices": ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
         },
+        "response_format": {
+            "label": "Audio Format",
+            "description": "Format of the generated audio (opus is about half the size of mp3 at similar quality)",
+            "type": "STRING",
+            "required": False,
+            "default": "mp3",
+            "choices": ["mp3", "opus", "aac", "flac", "wav", "pcm"]
+        },
         "output_file": {
             "label": "Output File",
-            "description": "Path to save the generated audio file (mp3 format)",
+            "description": "Path to save the generated audio file (in the selected audio format)",
             "type": "STRING",
             "widget": "FILE",
             "required": True,
             "default": "output.mp3"
         },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "AI Model",
             "description": "ID of the AI model configuration to use",
@@ -59,42 +79,49 @@ class TextToSpeechNode(Node):
     async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
             # Get inputs
-            text = node_inputs["text"]
-            voice = node_inputs["voice"]
-            output_file = node_inputs["output_file"]
-            llm_config_id = node_inputs["llm_config_id"]
+            inp = self._parse_inputs(node_inputs)
+            text = inp.text
+            voice = inp.voice
+            response_format = inp.response_format
+            output_file = inp.output_file
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
             
-            # Get LLM configuration
+            # Get LLM configuration, creating the output directory meanwhile
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
-            
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
-            
-            # Initialize OpenAI client
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
+            (llm_config, params), _ = await asyncio.gather(
+                load_llm_config(llm_config_id),
+                ensure_dir(output_file)
             )
             
-            # Create output directory if it doesn't exist
-            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+            # Get OpenAI client
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
             
-            # Make API call
-            workflow_logger.info("Sending request to TTS model")
-            response = client.audio.speech.create(
-                model=llm_config.llm_name,
-                voice=voice,
-                input=text
-            )
+            # Stream the audio to the file as it arrives
+            async def synthesize(**kwargs):
+                async with client.audio.speech.with_streaming_response.create(**kwargs) as response:
+                    async with aiofiles.open(output_file, 'wb') as f:
+                        async for chunk in response.iter_bytes(1 << 15):
+                            await f.write(chunk)
             
-            # Save the audio file
-            response.stream_to_file(output_file)
-            workflow_logger.info(f"Successfully saved audio to {output_file}")
+            api_params = {
+                "model": llm_config.llm_name,
+                "voice": voice,
+                "input": text,
+                "response_format": response_format
+            }
+            cache_key = await openai_cache.make_key("audio.speech", params.base_url, api_params) if use_cache else None
+            if cache_key and await openai_cache.get_file(cache_key, output_file):
+                workflow_logger.info(f"Saved cached audio to {output_file}")
+            else:
+                # Make API call
+                workflow_logger.info("Sending request to TTS model")
+                await call_api(limiter, synthesize, **api_params)
+                if cache_key:
+                    await openai_cache.put_file(cache_key, output_file)
+                workflow_logger.info(f"Successfully saved audio to {output_file}")
             
             return {
                 "success": True,
@@ -1,17 +1,26 @@
 try:
     from autotask.nodes import Node, register_node
     from autotask.api_keys import get_api_key
-    from autotask.llm import get_llm_config_by_id, LLMConfig
 except ImportError:
     from stub import Node, register_node
 
-import os
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
-import base64
+import asyncio
+from typing import Dict, Any, List
+
+from .image_encoding import (
+    delete_vision_files,
+    get_image_url,
+    get_vision_upload_mode,
+    is_image_url,
+    prefetch_image,
+)
+from . import openai_cache
+from .node_inputs import compile_inputs
+from .openai_client import create_chat_completion, get_client, get_limiter, load_llm_config
 
 
 @register_node
+@compile_inputs
 class VideoRecognitionNode(Node):
     NAME = "AI Video Recognition"
     DESCRIPTION = "Use AI to analyze and describe video content using multiple frames"
@@ -20,69 +29,14 @@ class VideoRecognitionNode(Node):
     ICON = "🎥"
 
     INPUTS = {
-        "img1": {
-            "label": "Image 1",
-            "description": "First frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
+        "images": {
+            "label": "Frames",
+            "description": "Frames/images of the video, in order",
+            "type": "LIST",
+            "item_type": "STRING",
+            "widget": "FILE_LIST",
             "required": True,
-            "default": ""
-        },
-        "img2": {
-            "label": "Image 2",
-            "description": "Second frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img3": {
-            "label": "Image 3",
-            "description": "Third frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img4": {
-            "label": "Image 4",
-            "description": "Fourth frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img5": {
-            "label": "Image 5",
-            "description": "Fifth frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img6": {
-            "label": "Image 6",
-            "description": "Sixth frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img7": {
-            "label": "Image 7",
-            "description": "Seventh frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
-        },
-        "img8": {
-            "label": "Image 8",
-            "description": "Eighth frame/image of the video",
-            "type": "STRING",
-            "widget": "FILE",
-            "required": False,
-            "default": ""
+            "default": []
         },
         "prompt": {
             "label": "Analysis Prompt",
@@ -91,6 +45,21 @@ class VideoRecognitionNode(Node):
             "required": True,
             "default": "Describe what happens in this video sequence"
         },
+        "mode": {
+            "label": "Request Mode",
+            "description": "realtime sends the request immediately, batch queues it for the Batch API (half the cost, results within 24 hours)",
+            "type": "STRING",
+            "required": False,
+            "default": "realtime",
+            "choices": ["realtime", "batch"]
+        },
+        "use_cache": {
+            "label": "Use Cache",
+            "description": "Reuse the result of an identical earlier request instead of calling the API again",
+            "type": "BOOLEAN",
+            "required": False,
+            "default": False
+        },
         "llm_config_id": {
             "label": "LLM Configuration",
             "description": "ID of the LLM configuration to use",
@@ -119,57 +88,56 @@ class VideoRecognitionNode(Node):
         }
     }
 
-    def _encode_image_to_base64(self, image_path: str) -> str:
-        """Convert image to base64 string."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-
-    def _get_image_url(self, image_path: str) -> str:
-        """Get image URL or base64 data URL."""
-        if image_path.startswith(('http://', 'https://')):
-            return image_path
-        else:
-            base64_image = self._encode_image_to_base64(image_path)
-            return f"data:image/jpeg;base64,{base64_image}"
-
-    def _get_valid_image_paths(self, node_inputs: Dict[str, str]) -> List[str]:
-        """Get all valid image paths from inputs."""
-        valid_images = []
-        for i in range(1, 9):
-            img_key = f"img{i}"
-            if img_key in node_inputs and node_inputs[img_key]:
-                valid_images.append(node_inputs[img_key])
-        return valid_images
-
-    async def execute(self, node_inputs: Dict[str, str], workflow_logger) -> Dict[str, Any]:
+    def _get_valid_image_paths(self, images: List[str]) -> List[str]:
+        """Get all valid image paths from the images input."""
+        return [p for p in images or [] if p]
+
+    async def execute(self, node_inputs: Dict[str, Any], workflow_logger) -> Dict[str, Any]:
         try:
-            image_paths = self._get_valid_image_paths(node_inputs)
+            inp = self._parse_inputs(node_inputs)
+            image_paths = self._get_valid_image_paths(inp.images)
             if not image_paths:
                 raise ValueError("At least one image path must be provided")
 
-            prompt = node_inputs["prompt"]
-            llm_config_id = node_inputs["llm_config_id"]
+            prompt = inp.prompt
+            mode = inp.mode
+            use_cache = inp.use_cache
+            llm_config_id = inp.llm_config_id
 
+            # Downscale the frames while the LLM configuration is being fetched
             workflow_logger.info(f"Getting LLM configuration for ID: {llm_config_id}")
-            llm_config: Optional[LLMConfig] = get_llm_config_by_id(llm_config_id)
-            if not llm_config:
-                raise ValueError(f"LLM configuration not found for ID: {llm_config_id}")
-
-            params = llm_config.get_typed_parameters()
-            if not params:
-                raise ValueError("Failed to get typed parameters from LLM configuration")
-
-            workflow_logger.info("Initializing OpenAI client")
-            client = OpenAI(
-                api_key=params.api_key,
-                base_url=params.base_url
+            (llm_config, params), downscaled = await asyncio.gather(
+                load_llm_config(llm_config_id),
+                asyncio.gather(*(prefetch_image(p) for p in image_paths))
             )
 
+            workflow_logger.info("Getting OpenAI client and rate limiter")
+            client = get_client(params)
+            limiter = get_limiter(params, llm_config.llm_name)
+
+            cache_key = None
+            if use_cache:
+                local_files = [p for p in image_paths if not is_image_url(p)]
+                cache_key = await openai_cache.make_key("chat.completions", params.base_url, {
+                    "model": llm_config.llm_name,
+                    "prompt": prompt,
+                    "video": image_paths
+                }, local_files)
+            response = await openai_cache.get(cache_key) if cache_key else None
+            if response is not None:
+                workflow_logger.info("Using cached AI analysis")
+                return {
+                    "success": True,
+                    "description": response,
+                    "error_message": ""
+                }
+
             # Prepare message content with video type
-            image_urls = []
-            for image_path in image_paths:
-                image_url = self._get_image_url(image_path)
-                image_urls.append(image_url)
+            upload_mode = get_vision_upload_mode(params)
+            image_urls = await asyncio.gather(
+                *(get_image_url(image_path, frame, client, upload_mode, use_cache)
+                  for image_path, frame in zip(image_paths, downscaled))
+            )
 
             content = [
                 {
@@ -182,16 +150,21 @@ class VideoRecognitionNode(Node):
                 }
             ]
 
-            workflow_logger.info("Sending request to AI model")
-            completion = client.chat.completions.create(
-                model=llm_config.llm_name,
-                messages=[{
-                    "role": "user",
-                    "content": content
-                }]
-            )
+            workflow_logger.info(f"Sending request to AI model ({mode})")
+            try:
+                response = await create_chat_completion(client, limiter, {
+                    "model": llm_config.llm_name,
+                    "messages": [{
+                        "role": "user",
+                        "content": content
+                    }]
+                }, mode)
+            finally:
+                if not use_cache:
+                    await delete_vision_files(client, image_urls)
+            if cache_key:
+                await openai_cache.put(cache_key, response)
 
-            response = completion.choices[0].message.content
             workflow_logger.info("Successfully received AI analysis")
 
             return {